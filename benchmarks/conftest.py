@@ -0,0 +1,217 @@
+"""Fixtures that generate synthetic Catalogs, Stimulus Sets and Data Assemblies for the benchmarks."""
+
+import hashlib
+import os
+import shutil
+import zipfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from urllib.parse import urlparse
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import pytest
+
+from bonner.brainio import _network
+from bonner.brainio._network import NetworkHandler
+from bonner.brainio._scheduler import TokenBucket
+
+SIZES = {
+    "quick": {
+        "n_rows": (1_000, 10_000),
+        "n_members": (10_000,),
+        "n_bytes": (2**24,),
+    },
+    "full": {
+        "n_rows": (1_000, 10_000, 100_000, 1_000_000),
+        "n_members": (10_000, 100_000, 1_000_000),
+        "n_bytes": (2**24, 2**30, 2**32),
+    },
+}
+"""Sizes of the synthetic inputs at each --benchmark-scale."""
+
+S3_BUCKET = "bonner-brainio-benchmarks"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmark-scale",
+        choices=tuple(SIZES),
+        default=os.getenv("BONNER_BRAINIO_BENCHMARK_SCALE", "quick"),
+        help=(
+            "size of the synthetic inputs: 'quick' (default) for a smoke run, 'full'"
+            " for 1M-row Catalogs, 1M-member ZIP archives and multi-GB Data Assemblies"
+        ),
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    sizes = SIZES[metafunc.config.getoption("--benchmark-scale")]
+    for name, values in sizes.items():
+        if name in metafunc.fixturenames:
+            metafunc.parametrize(name, values, ids=[f"{name}={v}" for v in values])
+
+
+def _sha1(string: str) -> str:
+    return hashlib.sha1(string.encode()).hexdigest()
+
+
+class LocalHandler(NetworkHandler):
+    """Copies files to/from a local "remote", standing in for a networked server."""
+
+    def upload(self, local_path: Path, remote_url: str) -> None:
+        remote_path = Path(urlparse(remote_url).path)
+        remote_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, remote_path)
+
+    def download(self, local_path: Path, remote_url: str) -> None:
+        shutil.copyfile(urlparse(remote_url).path, local_path)
+
+
+@pytest.fixture(autouse=True)
+def local_handler(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Register :class:`LocalHandler` under the location_type "local"."""
+    get_network_handler = _network.get_network_handler
+
+    def _get_network_handler(
+        location_type: str,
+        *,
+        token_bucket: TokenBucket | None = None,
+        concurrency: int = 1,
+    ) -> NetworkHandler:
+        if location_type == "local":
+            return LocalHandler(token_bucket=token_bucket, concurrency=concurrency)
+        return get_network_handler(
+            location_type, token_bucket=token_bucket, concurrency=concurrency
+        )
+
+    monkeypatch.setattr(_network, "get_network_handler", _get_network_handler)
+
+
+@pytest.fixture(scope="session")
+def data_directory(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Directory holding the synthetic inputs, shared by all the benchmarks."""
+    return tmp_path_factory.mktemp("data")
+
+
+@pytest.fixture(scope="session")
+def make_catalog(data_directory: Path) -> Callable[[int], Path]:
+    """Create a valid Catalog CSV file with ``n_rows`` rows.
+
+    Half of the rows are Data Assemblies and the other half are Stimulus Sets (two rows each).
+    """
+
+    def _make_catalog(n_rows: int) -> Path:
+        path = data_directory / f"catalog-{n_rows}.csv"
+        if path.exists():
+            return path
+
+        n_assemblies = n_rows // 2
+        n_stimulus_sets = (n_rows - n_assemblies) // 2
+        rows = []
+        for i in range(n_assemblies):
+            rows.append(
+                {
+                    "identifier": f"assembly-{i}",
+                    "lookup_type": "assembly",
+                    "sha1": _sha1(f"assembly-{i}"),
+                    "location_type": "local",
+                    "location": f"file:///remote/assembly-{i}.nc",
+                    "stimulus_set_identifier": (
+                        f"stimulus-set-{i % max(n_stimulus_sets, 1)}"
+                    ),
+                    "class": "xarray.DataArray",
+                }
+            )
+        for i in range(n_stimulus_sets):
+            for extension in ("csv", "zip"):
+                rows.append(
+                    {
+                        "identifier": f"stimulus-set-{i}",
+                        "lookup_type": "stimulus_set",
+                        "sha1": _sha1(f"stimulus-set-{i}.{extension}"),
+                        "location_type": "local",
+                        "location": f"file:///remote/stimulus-set-{i}.{extension}",
+                        "stimulus_set_identifier": "",
+                        "class": "",
+                    }
+                )
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return path
+
+    return _make_catalog
+
+
+@pytest.fixture(scope="session")
+def make_stimulus_set(data_directory: Path) -> Callable[[int], tuple[Path, Path]]:
+    """Create a valid Stimulus Set whose ZIP archive has ``n_members`` members."""
+
+    def _make_stimulus_set(n_members: int) -> tuple[Path, Path]:
+        path_csv = data_directory / f"stimulus-set-{n_members}.csv"
+        path_zip = data_directory / f"stimulus-set-{n_members}.zip"
+        if path_csv.exists() and path_zip.exists():
+            return path_csv, path_zip
+
+        filenames = [f"stimuli/{i:07d}.png" for i in range(n_members)]
+        pd.DataFrame(
+            {
+                "stimulus_id": [f"stimulus{i}" for i in range(n_members)],
+                "filename": filenames,
+            }
+        ).to_csv(path_csv, index=False)
+        with zipfile.ZipFile(path_zip, mode="w", compression=zipfile.ZIP_STORED) as f:
+            for filename in filenames:
+                f.writestr(filename, b"\x89PNG")
+        return path_csv, path_zip
+
+    return _make_stimulus_set
+
+
+@pytest.fixture(scope="session")
+def make_data_assembly(data_directory: Path) -> Callable[[int], Path]:
+    """Create a valid Data Assembly netCDF-4 file of roughly ``n_bytes`` bytes.
+
+    The data are written in slabs so that multi-GB files do not have to fit in memory.
+    """
+
+    def _make_data_assembly(n_bytes: int) -> Path:
+        path = data_directory / f"assembly-{n_bytes}.nc"
+        if path.exists():
+            return path
+
+        n_neuroids = 1024
+        n_presentations = max(n_bytes // (4 * n_neuroids), 1)
+        slab = 2**14
+        rng = np.random.default_rng(seed=0)
+        with netCDF4.Dataset(path, mode="w", format="NETCDF4") as dataset:
+            dataset.setncattr("identifier", f"assembly-{n_bytes}")
+            dataset.setncattr("stimulus_set_identifier", "stimulus-set")
+            dataset.createDimension("presentation", n_presentations)
+            dataset.createDimension("neuroid", n_neuroids)
+            variable = dataset.createVariable(
+                "assembly", "f4", ("presentation", "neuroid")
+            )
+            for start in range(0, n_presentations, slab):
+                stop = min(start + slab, n_presentations)
+                variable[start:stop, :] = rng.random(
+                    (stop - start, n_neuroids), dtype=np.float32
+                )
+        return path
+
+    return _make_data_assembly
+
+
+@pytest.fixture
+def s3_bucket() -> Iterator[str]:
+    """A mocked S3 bucket, reachable through :class:`bonner.brainio._network.S3Handler`."""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "benchmark")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "benchmark")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        with moto.mock_aws():
+            boto3.client("s3").create_bucket(Bucket=S3_BUCKET)
+            yield S3_BUCKET
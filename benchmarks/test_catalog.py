@@ -0,0 +1,100 @@
+"""Benchmarks for Catalog construction, lookups, appends and validation."""
+
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from bonner.brainio import Catalog
+from bonner.brainio._utils import validate_catalog
+
+
+def test_construct(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    tmp_path: Path,
+    n_rows: int,
+) -> None:
+    csv_file = make_catalog(n_rows)
+
+    def setup() -> None:
+        (tmp_path / ".catalog-fingerprint").unlink(missing_ok=True)
+
+    benchmark.pedantic(
+        Catalog,
+        args=("benchmark",),
+        kwargs={"csv_file": csv_file, "cache_directory": tmp_path},
+        setup=setup,
+        rounds=5,
+    )
+
+
+def test_construct_cached(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    tmp_path: Path,
+    n_rows: int,
+) -> None:
+    csv_file = make_catalog(n_rows)
+    Catalog("benchmark", csv_file=csv_file, cache_directory=tmp_path)
+    benchmark(
+        Catalog,
+        "benchmark",
+        csv_file=csv_file,
+        cache_directory=tmp_path,
+    )
+
+
+def test_validate(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    n_rows: int,
+) -> None:
+    benchmark(validate_catalog, path=make_catalog(n_rows))
+
+
+def test_lookup(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    tmp_path: Path,
+    n_rows: int,
+) -> None:
+    catalog = Catalog(
+        "benchmark", csv_file=make_catalog(n_rows), cache_directory=tmp_path
+    )
+    metadata = benchmark(
+        catalog._lookup, identifier="stimulus-set-0", lookup_type="stimulus_set"
+    )
+    assert len(metadata) == 2
+
+
+def test_append(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    tmp_path: Path,
+    n_rows: int,
+) -> None:
+    csv_file = tmp_path / "catalog.csv"
+    shutil.copyfile(make_catalog(n_rows), csv_file)
+    catalog = Catalog("benchmark", csv_file=csv_file, cache_directory=tmp_path)
+
+    def setup() -> None:
+        shutil.copyfile(make_catalog(n_rows), csv_file)
+
+    benchmark.pedantic(
+        catalog._append,
+        args=(
+            {
+                "identifier": "appended",
+                "lookup_type": "assembly",
+                "class": "xarray.DataArray",
+                "location_type": "local",
+                "location": "file:///remote/appended.nc",
+                "sha1": "0" * 40,
+                "stimulus_set_identifier": "",
+            },
+        ),
+        setup=setup,
+        rounds=5,
+    )
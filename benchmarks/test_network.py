@@ -0,0 +1,190 @@
+"""Benchmarks for fetching files through a local handler and a mocked S3 bucket."""
+
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import boto3
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from bonner.brainio import Catalog
+from bonner.brainio._network import fetch, fetch_all
+
+
+def test_fetch_local(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    tmp_path: Path,
+    n_bytes: int,
+) -> None:
+    path = make_data_assembly(n_bytes)
+    benchmark.pedantic(
+        fetch,
+        kwargs={
+            "path_cache": tmp_path,
+            "location_type": "local",
+            "location": f"file://{path}",
+            "use_cached": False,
+        },
+        rounds=3,
+    )
+
+
+def test_fetch_cached(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    n_bytes: int,
+) -> None:
+    path = make_data_assembly(n_bytes)
+    benchmark(
+        fetch,
+        path_cache=path.parent,
+        location_type="local",
+        location=f"file://{path}",
+    )
+
+
+def test_fetch_s3(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    s3_bucket: str,
+    tmp_path: Path,
+    n_bytes: int,
+) -> None:
+    path = make_data_assembly(n_bytes)
+    boto3.client("s3").upload_file(str(path), s3_bucket, path.name)
+    benchmark.pedantic(
+        fetch,
+        kwargs={
+            "path_cache": tmp_path,
+            "location_type": "S3",
+            "location": f"https://{s3_bucket}.s3.amazonaws.com/{path.name}",
+            "use_cached": False,
+        },
+        rounds=3,
+    )
+
+
+def test_load_data_assembly(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    tmp_path: Path,
+    n_bytes: int,
+) -> None:
+    path = make_data_assembly(n_bytes)
+    catalog = Catalog(
+        "benchmark",
+        csv_file=tmp_path / "catalog.csv",
+        cache_directory=tmp_path / "cache",
+    )
+    catalog.package_data_assembly(
+        path=path,
+        location_type="local",
+        location=f"file://{tmp_path / 'remote' / path.name}",
+        class_="xarray.DataArray",
+    )
+    benchmark.pedantic(
+        catalog.load_data_assembly,
+        kwargs={"identifier": f"assembly-{n_bytes}", "use_cached": False},
+        rounds=3,
+    )
+
+
+def test_load_stimulus_set(
+    benchmark: BenchmarkFixture,
+    make_stimulus_set: Callable[[int], tuple[Path, Path]],
+    tmp_path: Path,
+    n_members: int,
+) -> None:
+    path_csv, path_zip = make_stimulus_set(n_members)
+    catalog = Catalog(
+        "benchmark",
+        csv_file=tmp_path / "catalog.csv",
+        cache_directory=tmp_path / "cache",
+    )
+    catalog.package_stimulus_set(
+        identifier="stimulus-set",
+        path_csv=path_csv,
+        path_zip=path_zip,
+        location_type="local",
+        location_csv=f"file://{tmp_path / 'remote' / path_csv.name}",
+        location_zip=f"file://{tmp_path / 'remote' / path_zip.name}",
+        class_csv="",
+        class_zip="",
+    )
+    benchmark.pedantic(
+        catalog.load_stimulus_set,
+        kwargs={"identifier": "stimulus-set", "use_cached": False},
+        rounds=3,
+    )
+
+
+def test_export_import_bundle(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    make_stimulus_set: Callable[[int], tuple[Path, Path]],
+    tmp_path: Path,
+    n_bytes: int,
+    n_members: int,
+) -> None:
+    path_csv, path_zip = make_stimulus_set(n_members)
+    catalog = Catalog(
+        "benchmark",
+        csv_file=tmp_path / "catalog.csv",
+        cache_directory=tmp_path / "cache",
+    )
+    catalog.package_stimulus_set(
+        identifier="stimulus-set",
+        path_csv=path_csv,
+        path_zip=path_zip,
+        location_type="local",
+        location_csv=f"file://{tmp_path / 'remote' / path_csv.name}",
+        location_zip=f"file://{tmp_path / 'remote' / path_zip.name}",
+        class_csv="",
+        class_zip="",
+    )
+    path = make_data_assembly(n_bytes)
+    catalog.package_data_assembly(
+        path=path,
+        location_type="local",
+        location=f"file://{tmp_path / 'remote' / path.name}",
+        class_="xarray.DataArray",
+    )
+    path_bundle = tmp_path / "bundle.tar"
+    offline = tmp_path / "offline"
+
+    def export_import() -> None:
+        shutil.rmtree(offline, ignore_errors=True)
+        catalog.export_bundle(identifiers=[f"assembly-{n_bytes}"], path=path_bundle)
+        Catalog(
+            "offline",
+            csv_file=offline / "catalog.csv",
+            cache_directory=offline / "cache",
+        ).import_bundle(path=path_bundle)
+
+    benchmark.pedantic(export_import, rounds=3)
+    offline_catalog = Catalog(
+        "offline", csv_file=offline / "catalog.csv", cache_directory=offline / "cache"
+    )
+    offline_catalog.load_data_assembly(identifier=f"assembly-{n_bytes}")
+    offline_catalog.load_stimulus_set(identifier="stimulus-set")
+
+
+def test_fetch_all_local(
+    benchmark: BenchmarkFixture,
+    make_stimulus_set: Callable[[int], tuple[Path, Path]],
+    make_data_assembly: Callable[[int], Path],
+    tmp_path: Path,
+    n_bytes: int,
+    n_members: int,
+) -> None:
+    paths = [*make_stimulus_set(n_members), make_data_assembly(n_bytes)]
+    benchmark.pedantic(
+        fetch_all,
+        kwargs={
+            "path_cache": tmp_path,
+            "locations": [("local", f"file://{path}") for path in paths],
+            "use_cached": False,
+        },
+        rounds=3,
+    )
@@ -0,0 +1,38 @@
+"""Benchmarks for the start-up time of short-lived processes."""
+
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+
+def _run(code: str) -> None:
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_import(benchmark: BenchmarkFixture) -> None:
+    benchmark.pedantic(
+        _run,
+        args=(
+            "import sys, bonner.brainio;"
+            " assert not {'pandas', 'xarray', 'boto3'} & set(sys.modules)",
+        ),
+        rounds=5,
+    )
+
+
+def test_import_and_construct(
+    benchmark: BenchmarkFixture,
+    make_catalog: Callable[[int], Path],
+    tmp_path: Path,
+    n_rows: int,
+) -> None:
+    code = (
+        "from pathlib import Path; from bonner.brainio import Catalog;"
+        f" Catalog('benchmark', csv_file=Path({str(make_catalog(n_rows))!r}),"
+        f" cache_directory=Path({str(tmp_path)!r}))"
+    )
+    _run(code)
+    benchmark.pedantic(_run, args=(code,), rounds=5)
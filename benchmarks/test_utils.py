@@ -0,0 +1,43 @@
+"""Benchmarks for hashing and for Stimulus Set and Data Assembly validation."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from bonner.brainio._utils import (
+    compute_sha1,
+    validate_data_assembly,
+    validate_stimulus_set,
+)
+
+
+def test_compute_sha1(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    n_bytes: int,
+) -> None:
+    path = make_data_assembly(n_bytes)
+    benchmark.extra_info["bytes"] = path.stat().st_size
+    benchmark.pedantic(compute_sha1, args=(path,), rounds=3)
+
+
+def test_validate_data_assembly(
+    benchmark: BenchmarkFixture,
+    make_data_assembly: Callable[[int], Path],
+    n_bytes: int,
+) -> None:
+    benchmark(validate_data_assembly, path=make_data_assembly(n_bytes))
+
+
+def test_validate_stimulus_set(
+    benchmark: BenchmarkFixture,
+    make_stimulus_set: Callable[[int], tuple[Path, Path]],
+    n_members: int,
+) -> None:
+    path_csv, path_zip = make_stimulus_set(n_members)
+    benchmark.pedantic(
+        validate_stimulus_set,
+        kwargs={"path_csv": path_csv, "path_zip": path_zip},
+        rounds=3,
+    )
@@ -2,21 +2,31 @@
 
 __all__: list[str] = []
 
+import fcntl
+import io
+import json
 import os
+import shutil
+import tarfile
+import tempfile
 import zipfile
+from collections.abc import Collection
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import xarray as xr
-
-from ._network import fetch, send
+from ._network import fetch, fetch_all, get_cache_path, send, send_all
 from ._utils import (
     compute_sha1,
+    default_file_mode,
     validate_catalog,
     validate_data_assembly,
     validate_stimulus_set,
+    write_atomically,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 BONNER_BRAINIO_CACHE = Path(
     os.getenv("BONNER_BRAINIO_CACHE", str(Path.home() / ".cache" / "bonner-brainio"))
 )
@@ -61,7 +71,7 @@ class Catalog:
         if not self.cache_directory.exists():
             self.cache_directory.mkdir(parents=True, exist_ok=True)
 
-        validate_catalog(path=self.csv_file)
+        self._validate()
 
     def load_stimulus_set(
         self,
@@ -75,7 +85,7 @@ class Catalog:
 
         :param identifier: identifier of the Stimulus Set
         :param use_cached: whether to use the local cache, defaults to True
-        :param check_integrity: whether to check the SHA1 hashes of the files, defaults to True
+        :param check_integrity: whether to check the SHA1 hashes of the files, defaults to True (files imported from a bundle are trusted while their size and modification time are unchanged)
         :param validate: whether to ensure that the Stimulus Set conforms to the BrainIO specification, defaults to True
         :return: paths to the Stimulus Set CSV file and ZIP archive, with keys "csv" and "zip" respectively
         """
@@ -83,16 +93,14 @@ class Catalog:
         assert not metadata.empty, f"Stimulus Set {identifier} not found in Catalog"
 
         paths = {}
-        for row in metadata.itertuples():
-            path = fetch(
-                path_cache=self.cache_directory,
-                location_type=row.location_type,
-                location=row.location,
-                use_cached=use_cached,
-            )
-
+        fetched = fetch_all(
+            path_cache=self.cache_directory,
+            locations=list(zip(metadata["location_type"], metadata["location"])),
+            use_cached=use_cached,
+        )
+        for row, path in zip(metadata.itertuples(), fetched):
             if check_integrity:
-                assert row.sha1 == compute_sha1(
+                assert row.sha1 == self._compute_sha1(
                     path
                 ), f"SHA1 hash from the Catalog does not match that of {path}"
 
@@ -118,7 +126,7 @@ class Catalog:
 
         :param identifier: identifier of the Data Assembly
         :param use_cached: whether to use the local cache, defaults to True
-        :param check_integrity: whether to check the SHA1 hashes of the files, defaults to True
+        :param check_integrity: whether to check the SHA1 hashes of the files, defaults to True (files imported from a bundle are trusted while their size and modification time are unchanged)
         :param validate: whether to ensure that the Data Assembly conforms to the BrainIO specification, defaults to True
         :return: path to the Data Assembly netCDF-4 file
         """
@@ -133,7 +141,7 @@ class Catalog:
         )
 
         if check_integrity:
-            assert metadata["sha1"].item() == compute_sha1(
+            assert metadata["sha1"].item() == self._compute_sha1(
                 path
             ), f"SHA1 hash from the Catalog does not match that of {path}"
 
@@ -170,12 +178,15 @@ class Catalog:
 
         validate_stimulus_set(path_csv=path_csv, path_zip=path_zip)
 
-        for path, location, class_ in {
+        files = (
             (path_csv, location_csv, class_csv),
             (path_zip, location_zip, class_zip),
-        }:
-            send(path=path, location_type=location_type, location=location)
-            self._append(
+        )
+        send_all(
+            uploads=[(path, location_type, location) for path, location, _ in files]
+        )
+        self._append(
+            *(
                 {
                     "identifier": identifier,
                     "lookup_type": "stimulus_set",
@@ -185,8 +196,10 @@ class Catalog:
                     "sha1": compute_sha1(path),
                     "stimulus_set_identifier": "",
                 }
+                for path, location, class_ in files
             )
-        validate_catalog(self.csv_file)
+        )
+        self._validate()
 
     def package_data_assembly(
         self,
@@ -203,6 +216,8 @@ class Catalog:
         :param location: remote URL of the Data Assembly
         :param class_: class of the Data Assembly
         """
+        import xarray as xr
+
         validate_data_assembly(path=path)
 
         assembly = xr.open_dataset(path)
@@ -224,13 +239,154 @@ class Catalog:
                 "stimulus_set_identifier": assembly.attrs["stimulus_set_identifier"],
             }
         )
-        validate_catalog(self.csv_file)
+        self._validate()
+
+    def export_bundle(
+        self,
+        *,
+        identifiers: Collection[str],
+        path: Path,
+        use_cached: bool = True,
+    ) -> None:
+        """Export Data Assemblies and Stimulus Sets from the Catalog to a bundle for offline use.
+
+        The bundle is an uncompressed TAR archive containing the subset of the Catalog CSV file ("catalog.csv") and the files themselves, laid out as in the cache directory. The Stimulus Sets referenced by the Data Assemblies are included too. The SHA1 hashes of all the files are checked before they are added.
+
+        Only unpacking the bundle with :meth:`import_bundle` is supported: a bundle that is unpacked by hand or mounted in place carries no records of its verified hashes, so loading from it re-hashes every file.
+
+        :param identifiers: identifiers of the Data Assemblies and Stimulus Sets
+        :param path: path where the bundle should be created
+        :param use_cached: whether to use the local cache, defaults to True
+        """
+        import pandas as pd
+
+        catalog = pd.read_csv(self.csv_file, dtype=str, keep_default_na=False)
+        identifiers = set(identifiers)
+        missing = identifiers - set(catalog["identifier"])
+        assert not missing, f"{sorted(missing)} not found in Catalog"
+
+        assemblies = catalog.loc[
+            catalog["identifier"].isin(identifiers)
+            & (catalog["lookup_type"] == "assembly")
+        ]
+        identifiers |= set(assemblies["stimulus_set_identifier"]) & set(
+            catalog.loc[catalog["lookup_type"] == "stimulus_set", "identifier"]
+        )
+        subset = catalog.loc[catalog["identifier"].isin(identifiers)]
+
+        names = [
+            get_cache_path(path_cache=self.cache_directory, location=location).name
+            for location in subset["location"]
+        ]
+        assert len(names) == len(
+            set(names)
+        ), "The files in a bundle MUST have unique names"
+
+        fetched = fetch_all(
+            path_cache=self.cache_directory,
+            locations=list(zip(subset["location_type"], subset["location"])),
+            use_cached=use_cached,
+        )
+        with tarfile.open(path, mode="w") as tar:
+            for row, path_file in zip(subset.itertuples(), fetched):
+                assert row.sha1 == self._compute_sha1(
+                    path_file
+                ), f"SHA1 hash from the Catalog does not match that of {path_file}"
+                tar.add(path_file, arcname=path_file.name)
+
+            data = subset.to_csv(index=False).encode()
+            tarinfo = tarfile.TarInfo("catalog.csv")
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+
+    def import_bundle(self, *, path: Path) -> None:
+        """Import a bundle created by :meth:`export_bundle` into the Catalog.
+
+        The files are extracted to the cache directory and the rows of the bundle's Catalog CSV file that are not already present are appended to the Catalog. The SHA1 hashes in the bundle were checked on export, so they are recorded as-is: subsequent loads make no network calls and do not re-hash the files.
+
+        Nothing is modified if a Data Assembly or Stimulus Set in the bundle is already in the Catalog with different files.
+
+        :param path: path to the bundle
+        """
+        import pandas as pd
+
+        catalog = pd.read_csv(self.csv_file, dtype=str, keep_default_na=False)
+        with tarfile.open(path, mode="r") as tar:
+            file = tar.extractfile("catalog.csv")
+            assert file is not None, f"{path} does not contain a Catalog CSV file"
+            bundle = pd.read_csv(file, dtype=str, keep_default_na=False)
+
+            existing = catalog.groupby(["identifier", "lookup_type"])["sha1"].agg(set)
+            for key, sha1s in (
+                bundle.groupby(["identifier", "lookup_type"])["sha1"].agg(set).items()
+            ):
+                assert key not in existing or existing[key] == sha1s, (
+                    f"{key[0]} ({key[1]}) is already in the Catalog with different"
+                    " SHA1 hashes"
+                )
+            new = bundle.loc[~bundle["sha1"].isin(catalog["sha1"])]
+            assert not new["identifier"].isin(catalog["identifier"]).any(), (
+                f"The bundle {path} adds files to Data Assemblies or Stimulus Sets"
+                " already in the Catalog"
+            )
+
+            paths_bundle = [
+                get_cache_path(path_cache=self.cache_directory, location=location)
+                for location in bundle["location"]
+            ]
+            assert len(paths_bundle) == len(
+                set(paths_bundle)
+            ), "The files in a bundle MUST have unique names"
+
+            names = {
+                get_cache_path(path_cache=self.cache_directory, location=location).name
+                for location in catalog["location"]
+            }
+            for location in new["location"]:
+                name = get_cache_path(
+                    path_cache=self.cache_directory, location=location
+                ).name
+                assert (
+                    name not in names
+                ), f"{name} is already used by another file in the Catalog"
+
+            extracted, sha1s = {}, {}
+            try:
+                for path_file, sha1 in zip(paths_bundle, bundle["sha1"]):
+                    source = tar.extractfile(path_file.name)
+                    assert (
+                        source is not None
+                    ), f"{path} does not contain {path_file.name}"
+                    with (
+                        source,
+                        tempfile.NamedTemporaryFile(
+                            dir=self.cache_directory, prefix=".", delete=False
+                        ) as destination,
+                    ):
+                        extracted[path_file] = Path(destination.name)
+                        sha1s[path_file] = sha1
+                        shutil.copyfileobj(source, destination)
+            except BaseException:
+                for path_temporary in extracted.values():
+                    path_temporary.unlink(missing_ok=True)
+                raise
+
+        mode = default_file_mode()
+        for path_file, path_temporary in extracted.items():
+            os.chmod(path_temporary, mode)
+            os.replace(path_temporary, path_file)
+        self._record_sha1s(sha1s)
+
+        self._append(*new.to_dict("records"))
+        self._validate()
 
     def _create(self, path: Path) -> None:
         """Create a new Catalog CSV file.
 
         :param path: path where the Catalog CSV file should be created
         """
+        import pandas as pd
+
         path.parent.mkdir(parents=True, exist_ok=True)
         catalog = pd.DataFrame(
             data=None,
@@ -251,24 +407,105 @@ class Catalog:
         *,
         identifier: str,
         lookup_type: str,
-    ) -> pd.DataFrame:
+    ) -> "pd.DataFrame":
         """Look up the metadata for a Data Assembly or Stimulus Set in the Catalog.
 
         :param identifier: identifier of the Data Assembly or Stimulus Set
         :param lookup_type: 'assembly' or 'stimulus_set', when looking up Data Assemblies or Stimulus Sets respectively
         :return: metadata corresponding to the Data Assembly or Stimulus Set
         """
+        import pandas as pd
+
         catalog = pd.read_csv(self.csv_file)
         filter_ = (catalog["identifier"] == identifier) & (
             catalog["lookup_type"] == lookup_type
         )
         return catalog.loc[filter_, :]
 
-    def _append(self, entry: dict[str, str]) -> None:
-        """Append an entry to the Catalog.
+    def _append(self, *entries: dict[str, str]) -> None:
+        """Append entries to the Catalog.
 
-        :param entry: a row to be appended to the Catalog CSV file, where keys correspond to column header names
+        :param entries: rows to be appended to the Catalog CSV file, where keys correspond to column header names
         """
+        import pandas as pd
+
+        if not entries:
+            return
+
         catalog = pd.read_csv(self.csv_file)
-        catalog = pd.concat([catalog, pd.DataFrame(entry, index=[len(catalog)])])
+        catalog = pd.concat(
+            [
+                catalog,
+                pd.DataFrame(
+                    entries, index=range(len(catalog), len(catalog) + len(entries))
+                ),
+            ]
+        )
         catalog.to_csv(self.csv_file, index=False)
+
+    def _validate(self) -> None:
+        """Validate the Catalog CSV file, unless it is unchanged since it was last validated.
+
+        The size, modification time and path of the Catalog CSV file are recorded in the cache directory after a successful validation, so that constructing a Catalog does not have to parse an unchanged file. Recording is skipped if the cache directory is not writable (e.g. read-only mounts).
+        """
+        stat = self.csv_file.stat()
+        fingerprint = f"{self.csv_file.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        path = self.cache_directory / ".catalog-fingerprint"
+        try:
+            if path.read_text() == fingerprint:
+                return
+        except OSError:
+            pass
+
+        validate_catalog(path=self.csv_file)
+        try:
+            write_atomically(path, fingerprint)
+        except OSError:
+            pass
+
+    def _compute_sha1(self, path: Path) -> str:
+        """Compute the SHA1 hash of a file in the cache directory.
+
+        Files imported from a bundle are not re-hashed while their size and modification time match those recorded by :meth:`import_bundle`; all other files are always hashed.
+
+        :param path: path to the file
+        :return: SHA1 hash of the file
+        """
+        stat = path.stat()
+        record = self._read_sha1_records().get(path.name)
+        if record and record["fingerprint"] == f"{stat.st_size}:{stat.st_mtime_ns}":
+            return record["sha1"]
+        return compute_sha1(path)
+
+    def _record_sha1s(self, sha1s: dict[Path, str]) -> None:
+        """Record the SHA1 hashes of files in the cache directory along with their sizes and modification times.
+
+        The records are updated under an exclusive lock and replaced atomically, so that several processes can share a cache directory.
+
+        :param sha1s: SHA1 hashes of the files, keyed by their paths
+        """
+        path = self.cache_directory / ".sha1.json"
+        with open(path.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                records = self._read_sha1_records()
+                for path_file, sha1 in sha1s.items():
+                    stat = path_file.stat()
+                    records[path_file.name] = {
+                        "fingerprint": f"{stat.st_size}:{stat.st_mtime_ns}",
+                        "sha1": sha1,
+                    }
+                write_atomically(path, json.dumps(records))
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_sha1_records(self) -> dict[str, dict[str, str]]:
+        """Read the SHA1 hashes recorded for files in the cache directory.
+
+        :return: records keyed by filename, with keys "fingerprint" and "sha1" (empty if there are none or the records are corrupt)
+        """
+        path = self.cache_directory / ".sha1.json"
+        try:
+            return json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
@@ -2,23 +2,54 @@
 
 __all__: list[str] = []
 
+import functools
+import math
 import os
 import subprocess
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
 from pathlib import Path
 from urllib.parse import urlparse
 
-import boto3
-import botocore
-from botocore.config import Config
+from ._scheduler import TokenBucket, TransferScheduler, get_scheduler
+
+RSYNC_TRANSIENT_EXIT_CODES = {10, 12, 30, 35, 255}
+"""Exit codes of rsync (and ssh) that indicate network errors worth retrying."""
+
+S3_TRANSIENT_ERROR_CODES = {
+    "InternalError",
+    "RequestTimeout",
+    "ServiceUnavailable",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "500",
+    "502",
+    "503",
+    "504",
+}
+"""Error codes returned by S3 that indicate errors worth retrying."""
 
 
 class NetworkHandler(ABC):
     """An abstract base class that implements the 'upload' and 'download' methods."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self, *, token_bucket: TokenBucket | None = None, concurrency: int = 1
+    ) -> None:
+        """Initialize a NetworkHandler.
+
+        :param token_bucket: token bucket used to limit the transfer rate, defaults to None (unlimited)
+        :param concurrency: number of transfers that may run at once and share the rate, defaults to 1
+        """
         super().__init__()
 
+        self.token_bucket = token_bucket
+        """Token bucket used to limit the transfer rate, if any."""
+
+        self.concurrency = concurrency
+        """Number of transfers that may run at once and share the rate."""
+
     @abstractmethod
     def upload(self, *, local_path: Path, remote_url: str) -> None:
         """Upload a file to the remote.
@@ -37,9 +68,20 @@ class NetworkHandler(ABC):
         """
         raise NotImplementedError()
 
+    def is_transient(self, error: Exception) -> bool:
+        """Determine whether an error raised during a transfer is transient, i.e. worth retrying.
+
+        :param error: the error raised by 'upload' or 'download'
+        :return: whether the error is transient
+        """
+        return False
+
 
 class RsyncHandler(NetworkHandler):
-    """Uses Rsync to upload and download files to/from a networked server."""
+    """Uses Rsync to upload and download files to/from a networked server.
+
+    Rsync cannot draw from the token bucket while it transfers, so if the rate is limited, each transfer is instead capped with '--bwlimit' at its share of the rate (the rate divided by the number of concurrent transfers).
+    """
 
     def upload(self, local_path: Path, remote_url: str) -> None:
         """Upload a file to the remote using Rsync.
@@ -58,13 +100,7 @@ class RsyncHandler(NetworkHandler):
             check=True,
         )
         subprocess.run(
-            [
-                "rsync",
-                "-vvczhW",
-                "--progress",
-                str(local_path),
-                remote_url,
-            ],
+            ["rsync", *self.options(), str(local_path), remote_url],
             check=True,
         )
 
@@ -76,10 +112,32 @@ class RsyncHandler(NetworkHandler):
         """
         if not local_path.exists():
             subprocess.run(
-                ["rsync", "-vzhW", "--progress", remote_url, str(local_path)],
+                ["rsync", *self.options(), remote_url, str(local_path)],
                 check=True,
             )
 
+    def options(self) -> list[str]:
+        """Get the command-line options passed to rsync.
+
+        :return: command-line options
+        """
+        options = ["-zhW"]
+        if self.token_bucket:
+            rate = self.token_bucket.rate / self.concurrency
+            options.append(f"--bwlimit={max(int(rate // 1024), 1)}")
+        return options
+
+    def is_transient(self, error: Exception) -> bool:
+        """Determine whether an error raised by rsync or ssh is transient.
+
+        :param error: the error raised by 'upload' or 'download'
+        :return: whether the error is transient
+        """
+        return (
+            isinstance(error, subprocess.CalledProcessError)
+            and error.returncode in RSYNC_TRANSIENT_EXIT_CODES
+        )
+
 
 class S3Handler(NetworkHandler):
     """Upload and download files to/from Amazon S3."""
@@ -90,79 +148,158 @@ class S3Handler(NetworkHandler):
         :param local_path: local path of the file
         :param remote_url: remote URL of the file
         """
+        import boto3
+
+        bucket_name, relative_path = self.parse_url(remote_url)
         client = boto3.client("s3")
-        client.upload_file(str(local_path), remote_url)
+        client.upload_file(
+            str(local_path),
+            bucket_name,
+            relative_path,
+            Callback=self.token_bucket.consume if self.token_bucket else None,
+        )
 
     def download(self, local_path: Path, remote_url: str) -> None:
         """Download a file from an S3 bucket.
 
+        Unsigned (anonymous) requests are made if there are no credentials or access is denied with the credentials.
+
         :param local_path: local path of the file
         :param remote_url: remote URL of the file
         """
-        parsed_url = urlparse(remote_url)
-        split_path = parsed_url.path.lstrip("/").split("/")
+        from botocore.exceptions import ClientError, NoCredentialsError
 
-        if parsed_url.hostname:
-            if "s3." in parsed_url.hostname:
-                bucket_name = parsed_url.hostname.split(".s3.")[0]
-                relative_path = os.path.join(*(split_path))
-            elif "s3-" in parsed_url.hostname:
-                bucket_name = split_path[0]
-                relative_path = os.path.join(*(split_path[1:]))
-        else:
-            raise ValueError(f"parsing the URL {remote_url} did not yield any hostname")
+        bucket_name, relative_path = self.parse_url(remote_url)
 
         try:
             self.download_helper(
                 local_path=local_path,
                 bucket_name=bucket_name,
                 relative_path=relative_path,
-                config=None,
+                unsigned=False,
             )
-        except Exception:
-            config = Config(signature_version=botocore.UNSIGNED)
+        except (ClientError, NoCredentialsError) as error:
+            if isinstance(error, ClientError) and error.response["Error"].get(
+                "Code"
+            ) not in {"401", "403", "AccessDenied", "Forbidden"}:
+                raise
             self.download_helper(
                 local_path=local_path,
                 bucket_name=bucket_name,
                 relative_path=relative_path,
-                config=config,
+                unsigned=True,
             )
 
+    def parse_url(self, remote_url: str) -> tuple[str, str]:
+        """Parse the URL of a file in an S3 bucket.
+
+        :param remote_url: remote URL of the file
+        :raises ValueError: if the URL is not an S3 URL
+        :return: name of the S3 bucket and relative path of the file within the S3 bucket
+        """
+        parsed_url = urlparse(remote_url)
+        split_path = parsed_url.path.lstrip("/").split("/")
+
+        if parsed_url.hostname:
+            if "s3." in parsed_url.hostname:
+                bucket_name = parsed_url.hostname.split(".s3.")[0]
+                relative_path = os.path.join(*(split_path))
+            elif "s3-" in parsed_url.hostname:
+                bucket_name = split_path[0]
+                relative_path = os.path.join(*(split_path[1:]))
+            else:
+                raise ValueError(f"the URL {remote_url} is not an S3 URL")
+        else:
+            raise ValueError(f"parsing the URL {remote_url} did not yield any hostname")
+        return bucket_name, relative_path
+
     def download_helper(
         self,
         *,
         local_path: Path,
         bucket_name: str,
         relative_path: str,
-        config: Config | None,
+        unsigned: bool,
     ) -> None:
         """Utility function for downloading a file from S3.
 
+        boto3 is imported here rather than at module load since it is slow to import and only needed for S3.
+
         :param local_path: local path to file
         :param bucket_name: name of the S3 bucket
         :param relative_path: relative path of the file within the S3 bucket
-        :param config: TODO config for Amazon S3
+        :param unsigned: whether to make unsigned (anonymous) requests
         """
+        import boto3
+        import botocore
+        from botocore.config import Config
+
+        config = Config(signature_version=botocore.UNSIGNED) if unsigned else None
         s3 = boto3.resource("s3", config=config)
         obj = s3.Object(bucket_name, relative_path)
-        obj.download_file(local_path)
+        obj.download_file(
+            str(local_path),
+            Callback=self.token_bucket.consume if self.token_bucket else None,
+        )
 
+    def is_transient(self, error: Exception) -> bool:
+        """Determine whether an error raised by boto3 is transient.
 
-def get_network_handler(location_type: str) -> NetworkHandler:
+        :param error: the error raised by 'upload' or 'download'
+        :return: whether the error is transient
+        """
+        from boto3.exceptions import RetriesExceededError, S3UploadFailedError
+        from botocore import exceptions
+
+        if isinstance(
+            error,
+            (
+                exceptions.ConnectionError,
+                exceptions.HTTPClientError,
+                RetriesExceededError,
+            ),
+        ):
+            return True
+        if isinstance(error, exceptions.ClientError):
+            return error.response["Error"].get("Code") in S3_TRANSIENT_ERROR_CODES
+        if isinstance(error, S3UploadFailedError):
+            cause = error.__cause__ or error.__context__
+            return isinstance(cause, Exception) and self.is_transient(cause)
+        return False
+
+
+def get_network_handler(
+    location_type: str,
+    *,
+    token_bucket: TokenBucket | None = None,
+    concurrency: int = 1,
+) -> NetworkHandler:
     """Get the correct network handler for the provided location_type.
 
     :param location_type: location_type, as defined in the BrainIO specification
+    :param token_bucket: token bucket used to limit the transfer rate, defaults to None (unlimited)
+    :param concurrency: number of transfers that may run at once and share the rate, defaults to 1
     :raises ValueError: if the location_type provided is unsupported
     :return: the network handler used to upload/download files
     """
     if location_type == "rsync":
-        return RsyncHandler()
+        return RsyncHandler(token_bucket=token_bucket, concurrency=concurrency)
     elif location_type == "S3":
-        return S3Handler()
+        return S3Handler(token_bucket=token_bucket, concurrency=concurrency)
     else:
         raise ValueError(f"location_type {location_type} is unsupported")
 
 
+def get_cache_path(*, path_cache: Path, location: str) -> Path:
+    """Get the path in the local cache directory that a file at <location> is fetched to.
+
+    :param path_cache: path to the local cache directory
+    :param location: remote URL of the file
+    :return: local path to the file in the cache
+    """
+    return path_cache / Path(urlparse(location).path).name
+
+
 def fetch(
     *, path_cache: Path, location_type: str, location: str, use_cached: bool = True
 ) -> Path:
@@ -174,14 +311,53 @@ def fetch(
     :param use_cached: whether to use the local cache
     :return: local path to the fetched file
     """
-    path = path_cache / Path(urlparse(location).path).name
-    if (not path.exists()) or (not use_cached):
-        handler = get_network_handler(location_type)
-        handler.download(
-            remote_url=location,
-            local_path=path,
+    return fetch_all(
+        path_cache=path_cache,
+        locations=[(location_type, location)],
+        use_cached=use_cached,
+    )[0]
+
+
+def fetch_all(
+    *,
+    path_cache: Path,
+    locations: Sequence[tuple[str, str]],
+    use_cached: bool = True,
+) -> list[Path]:
+    """Fetch several files to the local cache directory concurrently, using the shared TransferScheduler.
+
+    The sizes of remote files are not known before they are downloaded, so downloads are started in the order of the locations.
+
+    :param path_cache: path to the local cache directory
+    :param locations: pairs of location_type and remote URL of the files
+    :param use_cached: whether to use the local cache
+    :return: local paths to the fetched files, in the same order as the locations
+    """
+    scheduler = get_scheduler()
+    paths, transfers = [], []
+    for location_type, location in locations:
+        path = get_cache_path(path_cache=path_cache, location=location)
+        paths.append(path)
+        if path.exists() and use_cached:
+            continue
+
+        handler = get_network_handler(
+            location_type,
+            token_bucket=scheduler.token_bucket,
+            concurrency=scheduler.get_concurrency(location_type),
         )
-    return path
+        transfers.append(
+            (
+                location_type,
+                functools.partial(
+                    handler.download, local_path=path, remote_url=location
+                ),
+                handler.is_transient,
+                None,
+            )
+        )
+    _run_all(scheduler=scheduler, transfers=transfers)
+    return paths
 
 
 def send(
@@ -190,14 +366,64 @@ def send(
     location_type: str,
     location: str,
 ) -> None:
-    """Send a file to <location>.
+    """Send a file to <location>, using the shared TransferScheduler.
 
     :param path: local path to the file
     :param location_type: method to use to fetch files from the location (e.g. "rsync", "s3")
     :param location: remote URL of the file
     """
-    handler = get_network_handler(location_type=location_type)
-    handler.upload(
-        remote_url=location,
-        local_path=path,
-    )
+    send_all(uploads=[(path, location_type, location)])
+
+
+def send_all(*, uploads: Sequence[tuple[Path, str, str]]) -> None:
+    """Send several files concurrently, smallest first, using the shared TransferScheduler.
+
+    :param uploads: local path, location_type and remote URL of each file
+    """
+    scheduler = get_scheduler()
+    transfers = []
+    for path, location_type, location in uploads:
+        handler = get_network_handler(
+            location_type,
+            token_bucket=scheduler.token_bucket,
+            concurrency=scheduler.get_concurrency(location_type),
+        )
+        transfers.append(
+            (
+                location_type,
+                functools.partial(handler.upload, local_path=path, remote_url=location),
+                handler.is_transient,
+                path.stat().st_size,
+            )
+        )
+    _run_all(scheduler=scheduler, transfers=transfers)
+
+
+def _run_all(
+    *,
+    scheduler: TransferScheduler,
+    transfers: Sequence[
+        tuple[str, Callable[[], None], Callable[[Exception], bool], int | None]
+    ],
+) -> None:
+    """Submit transfers to a TransferScheduler, smallest first, and wait for all of them.
+
+    The transfers are sorted before they are submitted since idle workers start a transfer as soon as it is queued.
+
+    :param scheduler: the TransferScheduler
+    :param transfers: location_type, transfer function, transient-error check and size (if known) of each transfer
+    """
+    futures = [
+        scheduler.submit(
+            location_type=location_type,
+            transfer=transfer,
+            is_transient=is_transient,
+            size=size,
+        )
+        for location_type, transfer, is_transient, size in sorted(
+            transfers,
+            key=lambda transfer: math.inf if transfer[3] is None else transfer[3],
+        )
+    ]
+    for future in futures:
+        future.result()
@@ -0,0 +1,322 @@
+"""Scheduling of file transfers: concurrency limits, rate limiting, retries and prioritization."""
+
+__all__: list[str] = []
+
+import fcntl
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_CONCURRENCY = {"rsync": 2, "S3": 8}
+"""Default maximum number of concurrent transfers for each location_type."""
+
+_Job = tuple[float, int, Callable[[], None], Callable[[Exception], bool], Future[None]]
+
+
+class TokenBucket:
+    """A token bucket that limits the rate at which bytes are transferred.
+
+    Consuming more tokens than are available puts the bucket into debt: the caller sleeps until the debt would be repaid at the configured rate, so concurrent callers share the rate.
+    """
+
+    def __init__(self, *, rate: float, capacity: float | None = None) -> None:
+        """Initialize a TokenBucket.
+
+        :param rate: rate at which tokens (bytes) are added to the bucket, per second
+        :param capacity: maximum number of tokens in the bucket, defaults to one second's worth
+        """
+        if rate <= 0:
+            raise ValueError(f"the rate of a TokenBucket must be positive, not {rate}")
+
+        self.rate = rate
+        """Rate at which tokens (bytes) are added to the bucket, per second."""
+
+        self.capacity = capacity if capacity is not None else rate
+        """Maximum number of tokens in the bucket."""
+
+        self._tokens = self.capacity
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n: int) -> None:
+        """Remove tokens from the bucket, sleeping if the bucket is in debt.
+
+        :param n: number of tokens (bytes) to remove
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._timestamp) * self.rate
+            )
+            self._timestamp = now
+            self._tokens -= n
+            delay = -self._tokens / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Slots:
+    """A limit on the number of concurrent transfers to a single location_type, shared between processes.
+
+    The slots are lock files in a directory shared by all the processes (e.g. the tasks of an array job). Without a lock directory, holding a slot always succeeds immediately: within a process, the limit is enforced by the number of worker threads.
+    """
+
+    def __init__(self, *, name: str, n: int, lock_directory: Path | None) -> None:
+        """Initialize Slots.
+
+        :param name: name of the slots, used to name the lock files
+        :param n: number of slots
+        :param lock_directory: directory shared between processes in which lock files are created, defaults to None
+        """
+        self.n = n
+        """Number of slots."""
+
+        self.lock_directory = lock_directory
+        """Directory in which lock files are created, if any."""
+
+        self.name = name
+        """Name of the slots."""
+
+    @contextmanager
+    def hold(self, poll_interval: float = 0.5) -> Iterator[None]:
+        """Hold a slot for the duration of the context.
+
+        :param poll_interval: seconds to wait between attempts to acquire a lock file, defaults to 0.5
+        """
+        if self.lock_directory is None:
+            yield
+            return
+
+        self.lock_directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            for i in range(self.n):
+                with open(self.lock_directory / f"{self.name}-{i}.lock", "a") as f:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+                    return
+            time.sleep(poll_interval)
+
+
+class TransferScheduler:
+    """Runs file transfers with per-location_type concurrency limits, shared rate limiting, and retries.
+
+    Each location_type gets its own pool of worker threads. Queued transfers are started smallest first; transfers of unknown size are started after those of known size, in the order they were submitted.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: dict[str, int] | None = None,
+        bandwidth: float | None = None,
+        lock_directory: Path | None = None,
+        max_attempts: int = 5,
+        backoff_base: float = 1,
+        backoff_max: float = 60,
+    ) -> None:
+        """Initialize a TransferScheduler.
+
+        :param concurrency: maximum number of concurrent transfers for each location_type, defaults to DEFAULT_CONCURRENCY (4 for location_types not listed)
+        :param bandwidth: maximum transfer rate in bytes per second of each location_type within this process, defaults to None (unlimited)
+        :param lock_directory: directory used to share the concurrency limits between processes, defaults to None (limits apply per process)
+        :param max_attempts: maximum number of attempts for each transfer, defaults to 5
+        :param backoff_base: base delay in seconds of the exponential backoff between attempts, defaults to 1
+        :param backoff_max: maximum delay in seconds between attempts, defaults to 60
+        """
+        for location_type, n in (concurrency or {}).items():
+            if n < 1:
+                raise ValueError(
+                    "the concurrency of a TransferScheduler must be at least 1, not"
+                    f" {n} for location_type {location_type}"
+                )
+
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        """Maximum number of concurrent transfers for each location_type."""
+
+        self.token_bucket = (
+            TokenBucket(rate=bandwidth) if bandwidth is not None else None
+        )
+        """Token bucket shared by the transfers of handlers that can draw from it while transferring (e.g. S3), if the bandwidth is limited. Rsync instead caps each transfer at its share of the rate."""
+
+        self.lock_directory = lock_directory
+        """Directory used to share the concurrency limits between processes, if any."""
+
+        self.max_attempts = max_attempts
+        """Maximum number of attempts for each transfer."""
+
+        self.backoff_base = backoff_base
+        """Base delay in seconds of the exponential backoff between attempts."""
+
+        self.backoff_max = backoff_max
+        """Maximum delay in seconds between attempts."""
+
+        self._queues: dict[str, list[_Job]] = {}
+        self._slots: dict[str, Slots] = {}
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+
+    def submit(
+        self,
+        *,
+        location_type: str,
+        transfer: Callable[[], None],
+        is_transient: Callable[[Exception], bool],
+        size: int | None = None,
+    ) -> Future[None]:
+        """Queue a transfer.
+
+        :param location_type: location_type of the transfer, which determines the concurrency limit
+        :param transfer: function that performs the transfer
+        :param is_transient: function that determines whether an exception raised by the transfer is worth retrying
+        :param size: size of the file in bytes, if known, used to start smaller transfers first
+        :return: a Future that is resolved when the transfer completes or fails
+        """
+        future: Future[None] = Future()
+        with self._condition:
+            if location_type not in self._queues:
+                self._start_workers(location_type)
+            heapq.heappush(
+                self._queues[location_type],
+                (
+                    math.inf if size is None else size,
+                    next(self._counter),
+                    transfer,
+                    is_transient,
+                    future,
+                ),
+            )
+            self._condition.notify_all()
+        return future
+
+    def get_concurrency(self, location_type: str) -> int:
+        """Get the maximum number of concurrent transfers for a location_type.
+
+        :param location_type: location_type of the transfers
+        :return: maximum number of concurrent transfers
+        """
+        return self.concurrency.get(location_type, 4)
+
+    def _start_workers(self, location_type: str) -> None:
+        """Start the pool of worker threads for a location_type.
+
+        :param location_type: location_type of the transfers handled by the pool
+        """
+        n = self.get_concurrency(location_type)
+        self._queues[location_type] = []
+        self._slots[location_type] = Slots(
+            name=location_type, n=n, lock_directory=self.lock_directory
+        )
+        for _ in range(n):
+            threading.Thread(
+                target=self._work, args=(location_type,), daemon=True
+            ).start()
+
+    def _work(self, location_type: str) -> None:
+        """Run queued transfers for a location_type, forever.
+
+        :param location_type: location_type of the transfers
+        """
+        queue = self._queues[location_type]
+        while True:
+            with self._condition:
+                while not queue:
+                    self._condition.wait()
+                _, _, transfer, is_transient, future = heapq.heappop(queue)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._run(
+                    location_type=location_type,
+                    transfer=transfer,
+                    is_transient=is_transient,
+                )
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+    def _run(
+        self,
+        *,
+        location_type: str,
+        transfer: Callable[[], None],
+        is_transient: Callable[[Exception], bool],
+    ) -> None:
+        """Run a transfer, retrying transient errors with exponential backoff and full jitter.
+
+        :param location_type: location_type of the transfer
+        :param transfer: function that performs the transfer
+        :param is_transient: function that determines whether an exception raised by the transfer is worth retrying
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                with self._slots[location_type].hold():
+                    transfer()
+                return
+            except Exception as error:
+                if attempt == self.max_attempts - 1 or not is_transient(error):
+                    raise
+            time.sleep(
+                random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+            )
+
+
+_scheduler: TransferScheduler | None = None
+
+
+def _reset_scheduler() -> None:
+    """Discard the shared TransferScheduler in a forked child, whose worker threads did not survive the fork."""
+    global _scheduler
+    _scheduler = None
+
+
+os.register_at_fork(after_in_child=_reset_scheduler)
+
+
+def get_scheduler() -> TransferScheduler:
+    """Get the TransferScheduler shared by all transfers in this process.
+
+    It is configured by the environment variables BONNER_BRAINIO_TRANSFER_CONCURRENCY (e.g. "rsync=2,S3=8"), BONNER_BRAINIO_BANDWIDTH (bytes per second) and BONNER_BRAINIO_LOCK_DIRECTORY.
+
+    :return: the shared TransferScheduler
+    """
+    global _scheduler
+    if _scheduler is None:
+        concurrency = {}
+        for item in os.getenv("BONNER_BRAINIO_TRANSFER_CONCURRENCY", "").split(","):
+            if item:
+                location_type, n = item.split("=")
+                if int(n) < 1:
+                    raise ValueError(
+                        "BONNER_BRAINIO_TRANSFER_CONCURRENCY must give each"
+                        f" location_type at least 1 concurrent transfer, not {item}"
+                    )
+                concurrency[location_type.strip()] = int(n)
+
+        bandwidth = os.getenv("BONNER_BRAINIO_BANDWIDTH")
+        if bandwidth and not float(bandwidth) > 0:
+            raise ValueError(
+                "BONNER_BRAINIO_BANDWIDTH must be a positive number of bytes per"
+                f" second, not {bandwidth}"
+            )
+        lock_directory = os.getenv("BONNER_BRAINIO_LOCK_DIRECTORY")
+        _scheduler = TransferScheduler(
+            concurrency=concurrency,
+            bandwidth=float(bandwidth) if bandwidth else None,
+            lock_directory=Path(lock_directory) if lock_directory else None,
+        )
+    return _scheduler
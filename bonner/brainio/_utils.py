@@ -2,14 +2,14 @@
 
 __all__: list[str] = []
 
+import csv
 import hashlib
+import os
 import re
+import tempfile
 import zipfile
 from pathlib import Path
 
-import pandas as pd
-import xarray as xr
-
 
 def validate_catalog(path: Path) -> None:
     """Validate a BrainIO Catalog.
@@ -21,13 +21,13 @@ def validate_catalog(path: Path) -> None:
 
     :param path: path to the Catalog CSV file
     """
-    assert pd.read_csv(
-        path,
-        nrows=1,
-        dtype=str,
-    ).columns.is_unique, (
-        f"The column headers of the Catalog CSV file {path} MUST be unique"
-    )
+    import pandas as pd
+
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    assert len(header) == len(
+        set(header)
+    ), f"The column headers of the Catalog CSV file {path} MUST be unique"
 
     catalog = pd.read_csv(path, dtype=str)
     required_columns = {
@@ -103,6 +103,7 @@ def validate_data_assembly(path: Path) -> None:
 
     :param path: path to the Data Assembly netCDF-4 file
     """
+    import xarray as xr
 
     assembly = xr.open_dataset(path)
 
@@ -131,6 +132,8 @@ def validate_stimulus_set(*, path_csv: Path, path_zip: Path) -> None:
     :param path_csv: path to the Stimulus Set CSV file
     :param path_zip: path to the Stimulus Set ZIP file
     """
+    import pandas as pd
+
     assert (
         pd.read_csv(path_csv, nrows=1).columns.is_unique,
     ), f"The column headers of the Stimulus Set CSV file {path_csv} MUST be unique"
@@ -181,3 +184,33 @@ def compute_sha1(path: Path) -> str:
             sha1.update(buffer)
             buffer = f.read(buffer_size)
     return sha1.hexdigest()
+
+
+def default_file_mode() -> int:
+    """Get the permissions that a new file created with open() receives under the current umask.
+
+    :return: permission bits of the file
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_atomically(path: Path, text: str) -> None:
+    """Write a text file atomically, by writing a temporary file in the same directory and renaming it.
+
+    The file receives the same permissions as one created with open().
+
+    :param path: path to the file
+    :param text: contents of the file
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=".", delete=False
+    ) as f:
+        f.write(text)
+    try:
+        os.chmod(f.name, default_file_mode())
+        os.replace(f.name, path)
+    except BaseException:
+        Path(f.name).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,168 @@
+"""Tests for exporting and importing bundles."""
+
+import io
+import os
+import shutil
+import tarfile
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pytest
+import xarray as xr
+
+from bonner.brainio import Catalog, _catalog, _network
+from bonner.brainio._network import NetworkHandler
+from bonner.brainio._scheduler import TokenBucket
+from bonner.brainio._utils import default_file_mode
+
+
+class LocalHandler(NetworkHandler):
+    """Copies files to/from a local "remote"."""
+
+    def upload(self, local_path: Path, remote_url: str) -> None:
+        remote_path = Path(urlparse(remote_url).path)
+        remote_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, remote_path)
+
+    def download(self, local_path: Path, remote_url: str) -> None:
+        shutil.copyfile(urlparse(remote_url).path, local_path)
+
+
+@pytest.fixture(autouse=True)
+def local_handler(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _get_network_handler(
+        location_type: str,
+        *,
+        token_bucket: TokenBucket | None = None,
+        concurrency: int = 1,
+    ) -> NetworkHandler:
+        return LocalHandler(token_bucket=token_bucket, concurrency=concurrency)
+
+    monkeypatch.setattr(_network, "get_network_handler", _get_network_handler)
+
+
+def _forbid(*args: object, **kwargs: object) -> None:
+    raise AssertionError("unexpected call")
+
+
+def _package(catalog: Catalog, tmp_path: Path, *, name: str, value: float) -> None:
+    path = tmp_path / f"{name}.nc"
+    xr.Dataset(
+        {"data": ("x", [value])},
+        attrs={"identifier": "assembly", "stimulus_set_identifier": "stimulus_set"},
+    ).to_netcdf(path)
+    catalog.package_data_assembly(
+        path=path,
+        location_type="local",
+        location=f"file://{tmp_path / name / 'assembly.nc'}",
+        class_="xarray.DataArray",
+    )
+
+
+def _catalog_at(directory: Path) -> Catalog:
+    return Catalog(
+        directory.name,
+        csv_file=directory / "catalog.csv",
+        cache_directory=directory / "cache",
+    )
+
+
+@pytest.fixture
+def bundle(tmp_path: Path) -> Path:
+    catalog = _catalog_at(tmp_path / "source")
+    _package(catalog, tmp_path, name="remote", value=1)
+    path = tmp_path / "bundle.tar"
+    catalog.export_bundle(identifiers=["assembly"], path=path)
+    return path
+
+
+def test_import_loads_without_network_or_hashing(
+    bundle: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    catalog = _catalog_at(tmp_path / "target")
+    catalog.import_bundle(path=bundle)
+
+    monkeypatch.setattr(_network, "get_network_handler", _forbid)
+    monkeypatch.setattr(_catalog, "compute_sha1", _forbid)
+    path = catalog.load_data_assembly(identifier="assembly")
+    assert path.stat().st_mode & 0o777 == default_file_mode()
+    assert (
+        catalog.cache_directory / ".sha1.json"
+    ).stat().st_mode & 0o777 == default_file_mode()
+
+
+def test_recorded_hashes_are_trusted_until_the_file_changes(
+    bundle: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    catalog = _catalog_at(tmp_path / "target")
+    catalog.import_bundle(path=bundle)
+    path = catalog.cache_directory / "assembly.nc"
+
+    calls = []
+    compute_sha1 = _catalog.compute_sha1
+
+    def _compute_sha1(path: Path) -> str:
+        calls.append(path)
+        return compute_sha1(path)
+
+    monkeypatch.setattr(_catalog, "compute_sha1", _compute_sha1)
+    catalog.load_data_assembly(identifier="assembly")
+    assert not calls
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    catalog.load_data_assembly(identifier="assembly")
+    assert calls == [path]
+
+
+def test_conflicting_bundle_leaves_catalog_untouched(
+    bundle: Path, tmp_path: Path
+) -> None:
+    catalog = _catalog_at(tmp_path / "target")
+    _package(catalog, tmp_path, name="other", value=2)
+    csv = catalog.csv_file.read_bytes()
+    cached = {
+        path.name: path.read_bytes() for path in catalog.cache_directory.iterdir()
+    }
+
+    with pytest.raises(AssertionError, match="different SHA1 hashes"):
+        catalog.import_bundle(path=bundle)
+
+    assert catalog.csv_file.read_bytes() == csv
+    assert {
+        path.name: path.read_bytes() for path in catalog.cache_directory.iterdir()
+    } == cached
+    _catalog_at(tmp_path / "target").load_data_assembly(identifier="assembly")
+
+
+def test_rejects_bundle_with_duplicate_names(bundle: Path, tmp_path: Path) -> None:
+    with tarfile.open(bundle) as tar:
+        csv = tar.extractfile("catalog.csv")
+        assert csv is not None
+        header, row = csv.read().decode().splitlines()
+        members = {
+            member.name: tar.extractfile(member)
+            for member in tar.getmembers()
+            if member.name != "catalog.csv"
+        }
+        contents = {name: f.read() for name, f in members.items() if f is not None}
+
+    duplicate = tmp_path / "duplicate.tar"
+    rows = [
+        row,
+        row.replace("assembly,", "other,", 1).replace(row.split(",")[2], "0" * 40),
+    ]
+    with tarfile.open(duplicate, mode="w") as tar:
+        for name, data in {
+            **contents,
+            "catalog.csv": "\n".join([header, *rows]).encode(),
+        }.items():
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+
+    catalog = _catalog_at(tmp_path / "target")
+    with pytest.raises(AssertionError, match="unique names"):
+        catalog.import_bundle(path=duplicate)
+    assert not list(catalog.cache_directory.glob(".tmp*"))
+    assert not list(catalog.cache_directory.glob("*.nc"))
@@ -0,0 +1,176 @@
+"""Tests for the transfer scheduler."""
+
+import multiprocessing
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from bonner.brainio import _scheduler
+from bonner.brainio._network import RsyncHandler
+from bonner.brainio._scheduler import (
+    Slots,
+    TokenBucket,
+    TransferScheduler,
+    get_scheduler,
+)
+
+
+def _is_transient(error: Exception) -> bool:
+    return isinstance(error, ConnectionError)
+
+
+def _flaky(attempts: list[int], *, failures: int, error: Exception) -> None:
+    attempts.append(1)
+    if len(attempts) <= failures:
+        raise error
+
+
+def test_retries_transient_errors() -> None:
+    scheduler = TransferScheduler(backoff_base=0)
+    attempts: list[int] = []
+    scheduler.submit(
+        location_type="test",
+        transfer=lambda: _flaky(attempts, failures=2, error=ConnectionError()),
+        is_transient=_is_transient,
+    ).result(timeout=5)
+    assert len(attempts) == 3
+
+
+def test_does_not_retry_other_errors() -> None:
+    scheduler = TransferScheduler(backoff_base=0)
+    attempts: list[int] = []
+    with pytest.raises(ValueError):
+        scheduler.submit(
+            location_type="test",
+            transfer=lambda: _flaky(attempts, failures=1, error=ValueError()),
+            is_transient=_is_transient,
+        ).result(timeout=5)
+    assert len(attempts) == 1
+
+
+def test_gives_up_after_max_attempts() -> None:
+    scheduler = TransferScheduler(max_attempts=4, backoff_base=0)
+    attempts: list[int] = []
+    with pytest.raises(ConnectionError):
+        scheduler.submit(
+            location_type="test",
+            transfer=lambda: _flaky(attempts, failures=10, error=ConnectionError()),
+            is_transient=_is_transient,
+        ).result(timeout=5)
+    assert len(attempts) == 4
+
+
+def test_starts_smallest_first() -> None:
+    scheduler = TransferScheduler(concurrency={"test": 1})
+    started = threading.Event()
+    release = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait()
+
+    scheduler.submit(location_type="test", transfer=block, is_transient=_is_transient)
+    started.wait(timeout=5)
+
+    order: list[int | None] = []
+
+    def append_size(size: int | None) -> Callable[[], None]:
+        def transfer() -> None:
+            order.append(size)
+
+        return transfer
+
+    futures = [
+        scheduler.submit(
+            location_type="test",
+            transfer=append_size(size),
+            is_transient=_is_transient,
+            size=size,
+        )
+        for size in (300, None, 100, 200)
+    ]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert order == [100, 200, 300, None]
+
+
+def test_token_bucket_limits_throughput() -> None:
+    bucket = TokenBucket(rate=1e6, capacity=1e5)
+
+    def consume() -> None:
+        for _ in range(4):
+            bucket.consume(50_000)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=consume) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 600 kB at 1 MB/s, less the 100 kB initially in the bucket
+    assert time.monotonic() - start >= 0.45
+
+
+def test_rejects_non_positive_bandwidth(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+    monkeypatch.setattr(_scheduler, "_scheduler", None)
+    monkeypatch.setenv("BONNER_BRAINIO_BANDWIDTH", "0")
+    with pytest.raises(ValueError):
+        get_scheduler()
+
+
+def test_slots_are_shared_through_lock_files(tmp_path: Path) -> None:
+    running = []
+    concurrent = []
+
+    def hold() -> None:
+        with Slots(name="test", n=1, lock_directory=tmp_path).hold(poll_interval=0.01):
+            running.append(1)
+            concurrent.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert concurrent == [1, 1, 1, 1]
+
+
+def _transfer_in_child() -> bool:
+    get_scheduler().submit(
+        location_type="test", transfer=lambda: None, is_transient=_is_transient
+    ).result(timeout=5)
+    return True
+
+
+def test_scheduler_survives_fork(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(_scheduler, "_scheduler", None)
+    assert _transfer_in_child()
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        assert pool.apply(_transfer_in_child)
+
+
+def test_rsync_is_capped_at_its_share_of_the_rate() -> None:
+    handler = RsyncHandler(token_bucket=TokenBucket(rate=4 * 2**20), concurrency=2)
+    assert "--bwlimit=2048" in handler.options()
+    assert handler.is_transient(subprocess.CalledProcessError(255, "rsync"))
+    assert not handler.is_transient(subprocess.CalledProcessError(23, "rsync"))
+
+
+def test_rejects_concurrency_below_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        TransferScheduler(concurrency={"S3": 0})
+
+    monkeypatch.setattr(_scheduler, "_scheduler", None)
+    monkeypatch.setenv("BONNER_BRAINIO_TRANSFER_CONCURRENCY", "rsync=2,S3=0")
+    with pytest.raises(ValueError):
+        get_scheduler()